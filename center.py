@@ -1,12 +1,25 @@
-import simpy
-import random
-import statistics
+import multiprocessing
+import os
+import queue
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
 import tkinter as tk
 from dataclasses import dataclass
 from tkinter import ttk
+import matplotlib
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Rendering speed-ups for long series: drop nearly-collinear vertices and
+# let the Agg backend process large paths in chunks.
+matplotlib.rcParams['path.simplify'] = True
+matplotlib.rcParams['path.simplify_threshold'] = 1.0
+matplotlib.rcParams['agg.path.chunksize'] = 10000
 
 # --- Parameters ---
 # Default values for the new simulation model
@@ -16,212 +29,401 @@ SIMULATION_TIME_WEEKS = 26 # 6 months
 WEEKLY_NEW_PATIENTS = 20
 BREAKDOWN_DURATION_HOURS = 2
 TREATMENT_DAY_HOURS = 10
+MAX_PLOT_POINTS = 2000 # Longer series are downsampled before plotting
+MAX_MARKER_POINTS = 200 # Denser series are drawn without per-point markers
 
 # --- Data Classes ---
 @dataclass
-class Patient:
-    id: int
-    treatment_duration_days: int
-    arrival_time: float
-
-# --- Simulation Class ---
-class RadiotherapyCenter:
-    def __init__(self, env, num_linacs, patients_per_hour_linac, treatment_day_hours):
-        self.env = env
-        self.patients_per_hour_linac = patients_per_hour_linac
-        # Capacity is the total number of patients that can be in treatment concurrently
-        daily_sessions_per_linac = treatment_day_hours * patients_per_hour_linac
-        total_capacity = num_linacs * daily_sessions_per_linac
-        self.treatment_slots = simpy.Container(env, capacity=total_capacity, init=total_capacity)
-        # A store for incoming patients waiting to start their treatment course
-        self.backlog = simpy.Store(env)
-        # Data for plotting backlog size over time
-        self.backlog_data = []
-        self.on_treatment_data = []
-        self.overtime_data = [] # (day, num_linacs_in_ot)
-        self.overtime_patients_data = [] # (day, num_patients_in_ot_slots)
-        self.patients_started = 0
-        self.wait_times = [] # To store waiting times for analysis
-        self.on_treatment_count = 0
-        self.next_patient_id = 0
-        self.active_treatments = {} # Maps patient_id -> (process, linac_id)
-        self.linac_patients = [[] for _ in range(num_linacs)] # List of patient IDs on each LINAC
-        self.next_linac_idx = 0 # For round-robin assignment
-        # Overtime stats
-        self.overtime_backlog_threshold = 10
-        self.overtime_active_linacs = 0
-        self.total_linac_overtime_days = 0
-        self.overtime_active_days = 0
-        self.overtime_slots_per_linac = 2 * self.patients_per_hour_linac
-
-# --- Patient Process ---
-def patient_intake(env, center, weekly_new_patients, treatment_duration_weights):
-    """Generates new patients weekly and adds them to the backlog."""
-    treatment_options_weeks = [1, 2, 3, 4, 5, 6]
-
-    while True:
-        # Generate all patient durations for the week at once using the specified weights
-        new_patient_durations_weeks = random.choices(
-            population=treatment_options_weeks,
-            weights=treatment_duration_weights,
-            k=weekly_new_patients
-        )
-
-        for duration_weeks in new_patient_durations_weeks:
-            patient_id = center.next_patient_id
-            center.next_patient_id += 1
-            patient = Patient(
-                id=patient_id,
-                treatment_duration_days=duration_weeks * 5,
-                arrival_time=env.now
-            )
-            yield center.backlog.put(patient)
-
-        # Wait 5 working days for the next weekly intake
-        yield env.timeout(5)
-
-def treatment_scheduler(env, center):
-    """Pulls patients from the backlog as treatment slots become free."""
-    while True:
-        # 1. Wait for a patient to appear in the backlog.
-        patient = yield center.backlog.get()
-
-        # Record their waiting time
-        wait_time = env.now - patient.arrival_time
-        center.wait_times.append(wait_time)
-
-        # 2. Wait for a treatment slot to free up.
-        yield center.treatment_slots.get(1)
-
-        # 3. Assign patient to the next available LINAC in a round-robin fashion.
-        linac_id = center.next_linac_idx
-        center.next_linac_idx = (center.next_linac_idx + 1) % len(center.linac_patients)
-
-        # 4. Start the patient's treatment on the assigned LINAC.
-        env.process(patient_treatment_process(env, center, patient, linac_id))
-
-def patient_treatment_process(env, center, patient, linac_id):
-    """Represents the actual treatment course for a single patient, which can be interrupted."""
-    center.patients_started += 1
-    center.on_treatment_count += 1
-    # Register the patient as active on the assigned LINAC
-    center.active_treatments[patient.id] = (env.active_process, linac_id)
-    center.linac_patients[linac_id].append(patient.id)
-
-    remaining_duration = patient.treatment_duration_days
-    while remaining_duration > 0:
-        try:
-            # Store start time of this treatment segment
-            start_time = env.now
-            yield env.timeout(remaining_duration)
-            # If we get here, treatment finished without interruption
-            remaining_duration = 0
-        except simpy.Interrupt:
-            # Interrupted by a breakdown!
-            time_passed = env.now - start_time
-            remaining_duration -= time_passed
-            # Add one day penalty for the missed treatment
-            remaining_duration += 1
-
-    # Treatment is done, clean up.
-    center.linac_patients[linac_id].remove(patient.id)
-    del center.active_treatments[patient.id]
-    yield center.treatment_slots.put(1)
-    center.on_treatment_count -= 1
-
-# --- Breakdown Process ---
-def linac_breakdown_process(env, center, breakdown_impact, linac_id):
-    """A process for a single LINAC, causing one random breakdown per week on THIS machine."""
-    while True:
-        # Wait for a random time within the 5-day working week.
-        random_delay_in_week = random.uniform(0, 5)
-        yield env.timeout(random_delay_in_week)
-
-        # Get patients currently assigned to this specific LINAC
-        patients_on_this_linac = center.linac_patients[linac_id]
-        if patients_on_this_linac:
-            # A single linac breakdown impacts a number of patients equal to its lost session capacity.
-            num_to_interrupt = min(breakdown_impact, len(patients_on_this_linac))
-            patients_to_interrupt_ids = random.sample(patients_on_this_linac, k=num_to_interrupt)
-
-            for pid in patients_to_interrupt_ids:
-                # Check if patient still exists, as they might have finished treatment
-                # between sampling and interruption.
-                if pid in center.active_treatments:
-                    center.active_treatments[pid][0].interrupt() # Interrupt the process
-
-        # Wait for the rest of the week to pass before the next cycle.
-        yield env.timeout(5 - random_delay_in_week)
-
-# --- Closure Day Process ---
-def closure_day_process(env, center):
-    """Schedules a closure day every 4 weeks (20 working days), interrupting all active treatments."""
-    # The first closure is after 4 weeks.
-    yield env.timeout(20)
-    while True:
-        # Interrupt all active treatments.
-        # Create a copy of the keys to iterate over, as the dictionary might change during interruption.
-        active_patient_ids = list(center.active_treatments.keys())
-        for pid in active_patient_ids:
-            if pid in center.active_treatments:
-                center.active_treatments[pid][0].interrupt()
-
-        # Wait for the next closure day (4 weeks later).
-        yield env.timeout(20)
-
-# --- Overtime Process ---
-def overtime_manager(env, center, num_linacs, p_per_hr):
-    """Monitors backlog and adds/removes overtime capacity dynamically."""
-    while True:
-        # Check conditions at the start of each day
-        backlog_size = len(center.backlog.items)
-
-        # --- Logic to ADD overtime ---
-        # If backlog is high and we have capacity for more overtime
-        if backlog_size > center.overtime_backlog_threshold and center.overtime_active_linacs < num_linacs:
-            # Add one LINAC to overtime
-            center.overtime_active_linacs += 1
-            # Add its capacity to the treatment slots. This is non-blocking.
-            yield center.treatment_slots.put(center.overtime_slots_per_linac)
-
-        # --- Logic to REMOVE overtime ---
-        # If backlog is low and overtime is active
-        elif backlog_size <= center.overtime_backlog_threshold and center.overtime_active_linacs > 0:
-            # We will try to remove one LINAC's worth of overtime capacity.
-            # This will block until enough patients finish treatment to free up
-            # these slots. This correctly models scaling down.
-            yield center.treatment_slots.get(center.overtime_slots_per_linac)
-            center.overtime_active_linacs -= 1
-
-        # --- Statistics Tracking ---
-        if center.overtime_active_linacs > 0:
-            center.overtime_active_days += 1
-            center.total_linac_overtime_days += center.overtime_active_linacs
-
-        # Check once per day
-        yield env.timeout(1)
-
-# --- Monitoring Process ---
-def monitor(env, center):
-    """Records key metrics every day for plotting."""
+class SimulationResults:
+    """Plain-data summary of a run, safe to send back from a worker process."""
+    patients_started: int
+    final_backlog: int
+    backlog_max: int
+    wait_n: int
+    wait_mean: float
+    wait_max: float
+    overtime_active_days: int
+    total_linac_overtime_days: int
+    # Daily sample arrays, one value per working day starting at day 0
+    backlog_data: np.ndarray
+    on_treatment_data: np.ndarray
+    overtime_data: np.ndarray
+    overtime_patients_data: np.ndarray
+
+# --- Fast Queue Computation ---
+def _queue_step_core(arrivals, service, num_servers, downtime_start, downtime_end, has_downtime):
+    """Tight loop behind queue_step; JIT-compiled when Numba is available.
+
+    With only a handful of servers, a linear scan for the earliest-free
+    server beats a heap and compiles cleanly under Numba's nopython mode.
+    """
+    n = len(arrivals)
+    starts = np.empty(n, dtype=np.float64)
+    departs = np.empty(n, dtype=np.float64)
+    free_times = np.zeros(num_servers, dtype=np.float64)
+    outage_pending = has_downtime
+
+    for i in range(n):
+        earliest = 0
+        for j in range(1, num_servers):
+            if free_times[j] < free_times[earliest]:
+                earliest = j
+        if outage_pending and downtime_start <= free_times[earliest] < downtime_end:
+            # This server takes the outage: hold it until the window ends
+            # and serve the patient with the next-earliest server instead.
+            free_times[earliest] = downtime_end
+            outage_pending = False
+            for j in range(num_servers):
+                if free_times[j] < free_times[earliest]:
+                    earliest = j
+        start = arrivals[i]
+        if free_times[earliest] > start:
+            start = free_times[earliest]
+        starts[i] = start
+        departs[i] = start + service[i]
+        free_times[earliest] = departs[i]
+
+    return starts, departs
+
+if numba is not None:
+    _queue_step_core = numba.njit(cache=True)(_queue_step_core)
+
+def queue_step(arrivals, service, num_servers, downtime=None):
+    """Computes start and departure times for a multi-server FIFO queue directly.
+
+    For scenarios where arrivals and service times are known in advance and
+    servers are not interrupted mid-service, the queue outcome is fully
+    determined: each patient starts at max(their arrival, earliest server free
+    time). This computes every start/departure in one pass over the sorted
+    arrivals instead of stepping a discrete-event simulation, which is orders
+    of magnitude faster for large patient counts.
+
+    The full weekly model (random interrupts, dynamic overtime) cannot be
+    solved this way, but constant-rate sub-scenarios can.
+
+    Args:
+        arrivals: sorted arrival times (array-like of floats).
+        service: service duration per arrival (array-like, same length).
+        num_servers: number of identical servers.
+        downtime: optional (start, end) window during which one server is
+            out of service; the first server idle in that window is held
+            until the window ends.
+
+    Returns:
+        (starts, departs) as float64 numpy arrays.
+    """
+    arrivals = np.asarray(arrivals, dtype=np.float64)
+    service = np.asarray(service, dtype=np.float64)
+    if downtime is None:
+        downtime_start = downtime_end = 0.0
+    else:
+        downtime_start, downtime_end = float(downtime[0]), float(downtime[1])
+    return _queue_step_core(arrivals, service, num_servers,
+                            downtime_start, downtime_end, downtime is not None)
+
+# --- Simulation Core ---
+# The model is driven by an event heap. Only a handful of event kinds
+# exist; the kind value doubles as the tie-break priority for events
+# landing on the same day (start work first, then finish it, then adjust
+# overtime), and a sequence counter keeps ordering stable within a kind.
+#
+# The whole engine lives in _simulate_core, which works exclusively on
+# scalars and flat numpy arrays so Numba can compile it to native code
+# (heapq and Python objects are not available in nopython mode, so the
+# heap is four parallel arrays with manual sift helpers). Without Numba
+# the very same functions run under the plain interpreter.
+INTAKE_EVENT = 0
+CLOSURE_EVENT = 1
+BREAKDOWN_EVENT = 2
+COMPLETION_EVENT = 3
+OVERTIME_EVENT = 4
+
+OVERTIME_BACKLOG_THRESHOLD = 10
+
+def _event_lt(heap_t, heap_k, heap_s, i, j):
+    """Heap ordering: time, then kind (priority), then push sequence."""
+    if heap_t[i] != heap_t[j]:
+        return heap_t[i] < heap_t[j]
+    if heap_k[i] != heap_k[j]:
+        return heap_k[i] < heap_k[j]
+    return heap_s[i] < heap_s[j]
+
+def _heap_push(heap_t, heap_k, heap_s, heap_p, n, t, kind, seq, payload):
+    """Pushes one event onto the parallel-array heap; returns the new size."""
+    i = n
+    heap_t[i] = t
+    heap_k[i] = kind
+    heap_s[i] = seq
+    heap_p[i] = payload
+    while i > 0:
+        parent = (i - 1) // 2
+        if not _event_lt(heap_t, heap_k, heap_s, i, parent):
+            break
+        heap_t[i], heap_t[parent] = heap_t[parent], heap_t[i]
+        heap_k[i], heap_k[parent] = heap_k[parent], heap_k[i]
+        heap_s[i], heap_s[parent] = heap_s[parent], heap_s[i]
+        heap_p[i], heap_p[parent] = heap_p[parent], heap_p[i]
+        i = parent
+    return n + 1
+
+def _heap_pop(heap_t, heap_k, heap_s, heap_p, n):
+    """Pops the earliest event; returns (time, kind, payload, new size)."""
+    t = heap_t[0]
+    kind = heap_k[0]
+    payload = heap_p[0]
+    last = n - 1
+    heap_t[0] = heap_t[last]
+    heap_k[0] = heap_k[last]
+    heap_s[0] = heap_s[last]
+    heap_p[0] = heap_p[last]
+    i = 0
     while True:
-        center.backlog_data.append((env.now, len(center.backlog.items)))
-
-        # Record patients currently on treatment
-        center.on_treatment_data.append((env.now, center.on_treatment_count))
-
-        # Record overtime status for plotting
-        center.overtime_data.append((env.now, center.overtime_active_linacs))
-        ot_patients = center.overtime_active_linacs * center.overtime_slots_per_linac
-        center.overtime_patients_data.append((env.now, ot_patients))
-
-        yield env.timeout(1) # Record daily
+        child = 2 * i + 1
+        if child >= last:
+            break
+        if child + 1 < last and _event_lt(heap_t, heap_k, heap_s, child + 1, child):
+            child += 1
+        if not _event_lt(heap_t, heap_k, heap_s, child, i):
+            break
+        heap_t[i], heap_t[child] = heap_t[child], heap_t[i]
+        heap_k[i], heap_k[child] = heap_k[child], heap_k[i]
+        heap_s[i], heap_s[child] = heap_s[child], heap_s[i]
+        heap_p[i], heap_p[child] = heap_p[child], heap_p[i]
+        i = child
+    return t, kind, payload, last
+
+def _simulate_core(all_durations, breakdown_times, breakdown_linacs,
+                   num_linacs, weekly_new, breakdown_impact,
+                   total_capacity, overtime_slots_per_linac, sim_days, seed):
+    """Runs the whole event loop on flat arrays; JIT-compiled when Numba is available.
+
+    Patients are plain integer ids: ids are assigned in arrival order, so
+    the FIFO backlog is just the id range [next_start, n_admitted) and a
+    patient's arrival day is 5 * (id // weekly_new). Per-patient state
+    lives in struct-of-arrays columns (completion day, active slot), and
+    the active set is kept dense by swap-removal.
+
+    Disruptions never touch the heap; they only advance completion_day.
+    A completion event that pops early is therefore stale and is simply
+    re-pushed at the current target (lazy repair).
+
+    Returns the summary scalars plus the sparse state log from which the
+    daily plotting series are reconstructed.
+    """
+    np.random.seed(seed)
+
+    total_patients = all_durations.shape[0]
+    max_active = total_capacity + num_linacs * overtime_slots_per_linac
+
+    # The pending event heap: at most one completion per active patient,
+    # every breakdown pre-scheduled, plus the recurring bookkeeping events.
+    heap_cap = max_active + breakdown_times.shape[0] + 4
+    heap_t = np.empty(heap_cap, dtype=np.float64)
+    heap_k = np.empty(heap_cap, dtype=np.int64)
+    heap_s = np.empty(heap_cap, dtype=np.int64)
+    heap_p = np.empty(heap_cap, dtype=np.int64)
+    heap_n = 0
+    seq = 0
+
+    # Per-patient columns and the dense active set
+    completion_day = np.zeros(total_patients, dtype=np.int64)
+    slot_of = np.empty(total_patients, dtype=np.int64)
+    act_pid = np.empty(max_active, dtype=np.int64)
+    act_linac = np.empty(max_active, dtype=np.int64)
+    cand = np.empty(max_active, dtype=np.int64)
+    n_active = 0
+
+    # Backlog cursors: ids in [next_start, n_admitted) are waiting
+    n_admitted = 0
+    next_start = 0
+
+    free_slots = total_capacity
+    next_linac = 0
+    patients_started = 0
+    on_treatment = 0
+    backlog_max = 0
+    wait_n = 0
+    wait_sum = 0.0
+    wait_max = 0.0
+    overtime_linacs = 0
+    overtime_active_days = 0
+    total_linac_overtime_days = 0
+
+    # Sparse state log: one snapshot per state-changing event, from which
+    # the dense daily series are reconstructed after the run.
+    log_cap = total_patients + sim_days + sim_days // 5 + 8
+    log_t = np.empty(log_cap, dtype=np.float64)
+    log_backlog = np.empty(log_cap, dtype=np.int64)
+    log_on_tx = np.empty(log_cap, dtype=np.int64)
+    log_overtime = np.empty(log_cap, dtype=np.int64)
+    log_t[0] = 0.0
+    log_backlog[0] = 0
+    log_on_tx[0] = 0
+    log_overtime[0] = 0
+    log_n = 1
+
+    # Seed the heap: first intake at t=0, closures every 4 weeks, the
+    # daily overtime check, and every breakdown of the run up front.
+    seq += 1
+    heap_n = _heap_push(heap_t, heap_k, heap_s, heap_p, heap_n, 0.0, INTAKE_EVENT, seq, 0)
+    seq += 1
+    heap_n = _heap_push(heap_t, heap_k, heap_s, heap_p, heap_n, 20.0, CLOSURE_EVENT, seq, 0)
+    seq += 1
+    heap_n = _heap_push(heap_t, heap_k, heap_s, heap_p, heap_n, 0.0, OVERTIME_EVENT, seq, 0)
+    for i in range(breakdown_times.shape[0]):
+        seq += 1
+        heap_n = _heap_push(heap_t, heap_k, heap_s, heap_p, heap_n,
+                            breakdown_times[i], BREAKDOWN_EVENT, seq, breakdown_linacs[i])
+
+    # Pop events in time order until the horizon.
+    while heap_n > 0:
+        t, kind, payload, heap_n = _heap_pop(heap_t, heap_k, heap_s, heap_p, heap_n)
+        if t >= sim_days:
+            break
+        changed = False
+
+        if kind == COMPLETION_EVENT:
+            pid = payload
+            if completion_day[pid] > t:
+                seq += 1
+                heap_n = _heap_push(heap_t, heap_k, heap_s, heap_p, heap_n,
+                                    completion_day[pid], COMPLETION_EVENT, seq, pid)
+                continue
+            # Treatment is done; swap-removal keeps the active set dense.
+            slot = slot_of[pid]
+            last = n_active - 1
+            if slot != last:
+                moved = act_pid[last]
+                act_pid[slot] = moved
+                act_linac[slot] = act_linac[last]
+                slot_of[moved] = slot
+            n_active = last
+            free_slots += 1
+            on_treatment -= 1
+            changed = True
+
+        elif kind == BREAKDOWN_EVENT:
+            # One random breakdown on a single LINAC, delaying a sample of
+            # its patients. Victims are drawn without replacement by a
+            # partial Fisher-Yates shuffle over the candidate slots.
+            linac_id = payload
+            m = 0
+            for i in range(n_active):
+                if act_linac[i] == linac_id:
+                    cand[m] = i
+                    m += 1
+            if m > 0:
+                num_to_interrupt = breakdown_impact if breakdown_impact < m else m
+                for i in range(num_to_interrupt):
+                    j = i + int(np.random.random() * (m - i))
+                    cand[i], cand[j] = cand[j], cand[i]
+                # The victim slots are distinct, so the delay lands as one
+                # fused gather/scatter instead of a per-patient loop.
+                completion_day[act_pid[cand[:num_to_interrupt]]] += 1
+
+        elif kind == INTAKE_EVENT:
+            # Admit one week's worth of new patients: ids are sequential,
+            # so intake just moves the admission cursor forward.
+            week = payload
+            n_admitted += weekly_new
+            changed = True
+            if n_admitted < total_patients:
+                seq += 1
+                heap_n = _heap_push(heap_t, heap_k, heap_s, heap_p, heap_n,
+                                    t + 5.0, INTAKE_EVENT, seq, week + 1)
+
+        elif kind == CLOSURE_EVENT:
+            # A center-wide closure day every 4 weeks delays everyone, as a
+            # single vectorized update over the active id column.
+            completion_day[act_pid[:n_active]] += 1
+            seq += 1
+            heap_n = _heap_push(heap_t, heap_k, heap_s, heap_p, heap_n,
+                                t + 20.0, CLOSURE_EVENT, seq, 0)
+
+        else: # OVERTIME_EVENT
+            # Daily check that adds/removes overtime capacity dynamically.
+            backlog_size = n_admitted - next_start
+            if backlog_size > OVERTIME_BACKLOG_THRESHOLD and overtime_linacs < num_linacs:
+                # Add one LINAC to overtime and its capacity to the free pool.
+                overtime_linacs += 1
+                free_slots += overtime_slots_per_linac
+            elif backlog_size <= OVERTIME_BACKLOG_THRESHOLD and overtime_linacs > 0:
+                # Reclaim one LINAC's worth of overtime capacity immediately.
+                # free_slots may go negative until enough patients finish; no
+                # new treatments start until the debt is repaid.
+                free_slots -= overtime_slots_per_linac
+                overtime_linacs -= 1
+            if overtime_linacs > 0:
+                overtime_active_days += 1
+                total_linac_overtime_days += overtime_linacs
+            changed = True
+            seq += 1
+            heap_n = _heap_push(heap_t, heap_k, heap_s, heap_p, heap_n,
+                                t + 1.0, OVERTIME_EVENT, seq, 0)
+
+        # Start backlogged patients while free slots remain. A no-op after
+        # events that neither free capacity nor admit work, so it can run
+        # unconditionally instead of being repeated in each branch.
+        while free_slots > 0 and next_start < n_admitted:
+            pid = next_start
+            next_start += 1
+
+            # Record their waiting time (arrival day follows from the id)
+            wait_time = t - 5.0 * (pid // weekly_new)
+            wait_n += 1
+            wait_sum += wait_time
+            if wait_time > wait_max:
+                wait_max = wait_time
+
+            # Assign the patient to the next LINAC in a round-robin fashion
+            # and append them to the dense active set.
+            slot = n_active
+            act_pid[slot] = pid
+            act_linac[slot] = next_linac
+            slot_of[pid] = slot
+            n_active = slot + 1
+            next_linac = (next_linac + 1) % num_linacs
+
+            free_slots -= 1
+            patients_started += 1
+            on_treatment += 1
+
+            # Treatment is day-granular: the course ends a whole number of
+            # days from now, pushed back one day per disruption that hits it.
+            completion_day[pid] = int(t) + all_durations[pid]
+            seq += 1
+            heap_n = _heap_push(heap_t, heap_k, heap_s, heap_p, heap_n,
+                                completion_day[pid], COMPLETION_EVENT, seq, pid)
+
+        if changed:
+            backlog_size = n_admitted - next_start
+            log_t[log_n] = t
+            log_backlog[log_n] = backlog_size
+            log_on_tx[log_n] = on_treatment
+            log_overtime[log_n] = overtime_linacs
+            log_n += 1
+            if backlog_size > backlog_max:
+                backlog_max = backlog_size
+
+    return (patients_started, n_admitted - next_start, backlog_max,
+            wait_n, wait_sum, wait_max,
+            overtime_active_days, total_linac_overtime_days,
+            log_t[:log_n], log_backlog[:log_n], log_on_tx[:log_n], log_overtime[:log_n])
+
+if numba is not None:
+    _event_lt = numba.njit(cache=True)(_event_lt)
+    _heap_push = numba.njit(cache=True)(_heap_push)
+    _heap_pop = numba.njit(cache=True)(_heap_pop)
+    _simulate_core = numba.njit(cache=True)(_simulate_core)
 
 # --- Main Simulation Function ---
-def run_simulation(params):
-    """Main function to set up and run the simulation."""
-    env = simpy.Environment()
+def run_simulation(params, progress_queue=None, seed=None):
+    """Main function to set up and run the simulation.
 
+    A seed makes the run reproducible; it can be passed directly (as the
+    replication fan-out does) or as a 'seed' key in params. Left unset,
+    every run draws fresh entropy.
+    """
     # Unpack parameters from the GUI
     num_linacs = int(params['num_linacs'])
     p_per_hr = int(params['patients_per_hour_linac'])
@@ -240,61 +442,141 @@ def run_simulation(params):
         float(params['dist_6_week']),
     ]
 
-    center = RadiotherapyCenter(env, num_linacs, p_per_hr, treatment_day_hrs)
-
-    # The breakdown's impact is the number of treatment sessions lost
-    breakdown_impact = 1 * breakdown_hrs * p_per_hr
-
-    # Start the processes
-    env.process(monitor(env, center)) # Start monitoring first to get t=0 state
-    env.process(patient_intake(env, center, weekly_new, treatment_duration_weights))
-    # Start one scheduler process. It will handle all slot assignments.
-    env.process(treatment_scheduler(env, center))
-    # Start an independent, random breakdown process for each LINAC
-    for i in range(num_linacs):
-        env.process(linac_breakdown_process(env, center, breakdown_impact, i))
-
-    # Start the scheduled closure day process
-    env.process(closure_day_process(env, center))
+    # Normalize the slider weights to probabilities once, and express the
+    # duration options directly in working days (1-6 weeks of 5 days).
+    duration_probs = np.asarray(treatment_duration_weights, dtype=np.float64)
+    duration_probs /= duration_probs.sum()
+    options_days = np.array([5, 10, 15, 20, 25, 30], dtype=np.int32)
 
-    # Start the overtime manager process
-    env.process(overtime_manager(env, center, num_linacs, p_per_hr))
+    if seed is None and params.get('seed') not in (None, ''):
+        seed = int(params['seed'])
+    rng = np.random.default_rng(seed)
 
-    # Run the simulation
-    sim_duration_days = sim_weeks * 5 # 5 working days per week
-    env.run(until=sim_duration_days)
+    # Pre-draw the duration of every patient in the run with a single call.
+    all_durations = rng.choice(options_days, size=sim_weeks * weekly_new,
+                               p=duration_probs).astype(np.int64)
 
-    return center
+    # The breakdown's impact is the number of treatment sessions lost
+    breakdown_impact = 1 * breakdown_hrs * p_per_hr
+    total_capacity = num_linacs * treatment_day_hrs * p_per_hr
+    overtime_slots_per_linac = 2 * p_per_hr
+    sim_days = sim_weeks * 5 # 5 working days per week
+
+    # Every breakdown of the run comes from one batched draw of weekly
+    # within-week offsets, one breakdown per LINAC per week.
+    breakdown_offsets = rng.uniform(0.0, 5.0, size=(num_linacs, sim_weeks + 1))
+    breakdown_times = (np.arange(sim_weeks + 1) * 5.0 + breakdown_offsets).ravel()
+    breakdown_linacs = np.repeat(np.arange(num_linacs, dtype=np.int64), sim_weeks + 1)
+
+    # The core uses numpy's global legacy RNG (the only one available in
+    # nopython mode), seeded from the generator above.
+    seed = int(rng.integers(0, 2**31 - 1))
+    core_out = _simulate_core(all_durations, breakdown_times, breakdown_linacs,
+                              num_linacs, weekly_new, breakdown_impact,
+                              total_capacity, overtime_slots_per_linac, sim_days, seed)
+    results = collect_results(core_out, sim_days, overtime_slots_per_linac)
+
+    # The compiled core cannot call back into Python mid-run, so the weekly
+    # preview samples are published once it returns; at the core's speed
+    # the difference is not visible in the GUI.
+    if progress_queue is not None:
+        for day in range(0, sim_days, 5):
+            progress_queue.put((day, int(results.backlog_data[day]),
+                                int(results.on_treatment_data[day])))
+    return results
+
+def _run_one(args):
+    """One seeded replication; top-level so it pickles for worker processes."""
+    params, seed = args
+    return run_simulation(params, seed=seed)
 
 # --- Reporting Results ---
-def format_results(center, sim_time_weeks):
+def collect_results(core_out, sim_days, overtime_slots_per_linac):
+    """Packs the core's output tuple into a SimulationResults.
+
+    The daily plotting series are reconstructed here from the sparse state
+    log: for each working day, a searchsorted lookup finds the last
+    snapshot at or before it, which is exactly the state that day ended in.
+    """
+    (patients_started, final_backlog, backlog_max,
+     wait_n, wait_sum, wait_max,
+     overtime_active_days, total_linac_overtime_days,
+     log_t, log_backlog, log_on_tx, log_overtime) = core_out
+
+    day_grid = np.arange(sim_days)
+    idx = np.searchsorted(log_t, day_grid, side='right') - 1
+    overtime_data = log_overtime[idx].astype(np.int32)
+    return SimulationResults(
+        patients_started=patients_started,
+        final_backlog=final_backlog,
+        backlog_max=backlog_max,
+        wait_n=wait_n,
+        wait_mean=wait_sum / wait_n if wait_n else 0.0,
+        wait_max=wait_max,
+        overtime_active_days=overtime_active_days,
+        total_linac_overtime_days=total_linac_overtime_days,
+        backlog_data=log_backlog[idx].astype(np.int32),
+        on_treatment_data=log_on_tx[idx].astype(np.int32),
+        overtime_data=overtime_data,
+        overtime_patients_data=overtime_data * overtime_slots_per_linac,
+    )
+
+def aggregate_results(all_results):
+    """Reduces replicated runs to one mean summary plus spread bands.
+
+    Scalar metrics become their across-replication means; the daily series
+    become mean curves, with 10th-90th percentile bands for the backlog
+    and on-treatment series so the plot shows run-to-run spread.
+    """
+    backlog = np.stack([r.backlog_data for r in all_results])
+    on_tx = np.stack([r.on_treatment_data for r in all_results])
+    overtime = np.stack([r.overtime_data for r in all_results])
+    ot_patients = np.stack([r.overtime_patients_data for r in all_results])
+
+    def scalar_mean(attr):
+        return round(float(np.mean([getattr(r, attr) for r in all_results])), 2)
+
+    mean_results = SimulationResults(
+        patients_started=scalar_mean('patients_started'),
+        final_backlog=scalar_mean('final_backlog'),
+        backlog_max=scalar_mean('backlog_max'),
+        wait_n=scalar_mean('wait_n'),
+        wait_mean=scalar_mean('wait_mean'),
+        wait_max=scalar_mean('wait_max'),
+        overtime_active_days=scalar_mean('overtime_active_days'),
+        total_linac_overtime_days=scalar_mean('total_linac_overtime_days'),
+        backlog_data=backlog.mean(axis=0),
+        on_treatment_data=on_tx.mean(axis=0),
+        overtime_data=overtime.mean(axis=0),
+        overtime_patients_data=ot_patients.mean(axis=0),
+    )
+    bands = (np.quantile(backlog, 0.1, axis=0), np.quantile(backlog, 0.9, axis=0),
+             np.quantile(on_tx, 0.1, axis=0), np.quantile(on_tx, 0.9, axis=0))
+    return mean_results, bands
+
+def format_results(results, sim_time_weeks):
     """Formats the key metrics of the simulation into a string."""
-    results = []
-    results.append(f"--- Simulation Results ({sim_time_weeks} Weeks) ---")
-    results.append(f"Total patients who started treatment: {center.patients_started}")
-    final_backlog = len(center.backlog.items)
-    results.append(f"Patients still in backlog at end: {final_backlog}")
-
-    if center.backlog_data:
-        max_backlog = max(size for time, size in center.backlog_data)
-        results.append(f"Maximum backlog size reached: {max_backlog}")
-
-    if center.wait_times:
-        avg_wait_days = statistics.mean(center.wait_times)
-        max_wait_days = max(center.wait_times)
-        results.append(f"Average patient wait time: {avg_wait_days:.2f} working days")
-        results.append(f"Maximum patient wait time: {max_wait_days:.2f} working days")
-
-    results.append("\n--- Overtime Statistics ---")
-    results.append(f"Total days with active overtime: {center.overtime_active_days}")
-    results.append(f"Total LINAC-days of overtime: {center.total_linac_overtime_days}")
-    if center.overtime_active_days > 0:
-        avg_linacs = center.total_linac_overtime_days / center.overtime_active_days
-        results.append(f"Average LINACs in overtime on active days: {avg_linacs:.2f}")
+    lines = []
+    lines.append(f"--- Simulation Results ({sim_time_weeks} Weeks) ---")
+    lines.append(f"Total patients who started treatment: {results.patients_started}")
+    lines.append(f"Patients still in backlog at end: {results.final_backlog}")
+
+    lines.append(f"Maximum backlog size reached: {results.backlog_max}")
+
+    if results.wait_n:
+        lines.append(f"Average patient wait time: {results.wait_mean:.2f} working days")
+        lines.append(f"Maximum patient wait time: {results.wait_max:.2f} working days")
+
+    lines.append("\n--- Overtime Statistics ---")
+    lines.append(f"Total days with active overtime: {results.overtime_active_days}")
+    lines.append(f"Total LINAC-days of overtime: {results.total_linac_overtime_days}")
+    if results.overtime_active_days > 0:
+        avg_linacs = results.total_linac_overtime_days / results.overtime_active_days
+        lines.append(f"Average LINACs in overtime on active days: {avg_linacs:.2f}")
     else:
-        results.append("No overtime was required.")
+        lines.append("No overtime was required.")
 
-    return "\n".join(results)
+    return "\n".join(lines)
 
 # --- GUI Application ---
 class SimulationApp(tk.Tk):
@@ -306,8 +588,20 @@ class SimulationApp(tk.Tk):
         self.params = {}
         self.dist_vars = {}
         self.dist_labels = {}
+        self._pending_label_update = None
         self.create_widgets()
 
+        # The simulation is CPU-bound, so a thread would still contend with
+        # the GUI for the GIL; run it in worker processes instead. One
+        # worker serves a single run; Monte-Carlo mode fans replications
+        # out across all of them. The manager provides a queue the worker
+        # streams progress samples into.
+        self.executor = ProcessPoolExecutor(max_workers=os.cpu_count())
+        self.manager = multiprocessing.Manager()
+        self.progress_queue = None
+        self.run_active = False
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
     def create_widgets(self):
         main_frame = ttk.Frame(self, padding="10")
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
@@ -339,6 +633,14 @@ class SimulationApp(tk.Tk):
             entry.insert(0, str(default))
             self.params[key] = entry
 
+        # Replications above 1 switch to Monte-Carlo mode: independent
+        # seeded runs in parallel, averaged into mean curves with bands.
+        reps_row = len(param_defs)
+        ttk.Label(params_frame, text="Replications:").grid(row=reps_row, column=0, sticky=tk.W, pady=2)
+        self.replications_spin = ttk.Spinbox(params_frame, from_=1, to=200, width=8)
+        self.replications_spin.set(1)
+        self.replications_spin.grid(row=reps_row, column=1, sticky=tk.W, pady=2)
+
         # --- Treatment Distribution Frame ---
         dist_frame = ttk.LabelFrame(main_frame, text="Treatment Duration Mix (%)", padding="10")
         dist_frame.grid(row=0, column=1, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(5, 0), pady=(0, 10))
@@ -376,7 +678,7 @@ class SimulationApp(tk.Tk):
         self._update_distribution_labels() # Initial call to set percentages
 
         # --- Controls ---
-        self.run_button = ttk.Button(main_frame, text="Run Simulation", command=self.start_simulation_thread)
+        self.run_button = ttk.Button(main_frame, text="Run Simulation", command=self.start_simulation)
         self.run_button.grid(row=1, column=0, columnspan=2, pady=10, sticky=tk.W)
 
         # --- Results Frame ---
@@ -401,15 +703,29 @@ class SimulationApp(tk.Tk):
         self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
         self.canvas.get_tk_widget().grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
-    def start_simulation_thread(self):
-        self.run_button.config(state="disabled")
-        self.results_text.delete("1.0", tk.END)
-        self.results_text.insert(tk.END, "Running simulation...")
-        self.ax.clear()
+        # Persistent plot artists: the same Line2D objects serve the live
+        # preview and every finished run, so a redraw only swaps their data
+        # instead of clearing and rebuilding the whole axes.
+        (self.backlog_line,) = self.ax.plot([], [], label='Patients in Backlog', linestyle='-', markersize=4)
+        (self.on_tx_line,) = self.ax.plot([], [], label='Patients on Treatment', linestyle='-', markersize=4)
+        (self.ot_line,) = self.ax.plot([], [], label='Patients in Overtime Slots', color='purple', linestyle='--', markersize=4)
+        self._band_artists = [] # fill_betweens from Monte-Carlo mode, removed on redraw
         self.ax.set_xlabel("Time (Working Days)")
         self.ax.set_ylabel("Number of Patients")
-        self.ax.grid(True)
         self.ax.set_title("Patient Status Over Time")
+        self.ax.grid(True)
+        self.ax.legend()
+
+    def start_simulation(self):
+        self.run_button.config(state="disabled")
+        self.results_text.delete("1.0", tk.END)
+        self.results_text.insert(tk.END, "Running simulation...")
+
+        # Empty the persistent lines; they fill in as the worker publishes
+        # live preview samples.
+        self._live_days, self._live_backlog, self._live_on_tx = [], [], []
+        for line in (self.backlog_line, self.on_tx_line, self.ot_line):
+            line.set_data([], [])
         self.canvas.draw()
 
         try:
@@ -420,22 +736,73 @@ class SimulationApp(tk.Tk):
             # The sum does not need to be 100.
             for key, var in self.dist_vars.items():
                 current_params[key] = var.get()
+            n_reps = int(self.replications_spin.get())
         except ValueError:
             self.results_text.delete("1.0", tk.END)
             self.results_text.insert(tk.END, "Error: All parameters must be valid numbers.")
             self.run_button.config(state="normal")
             return
 
-        # Run simulation in a separate thread to not freeze the GUI
-        thread = threading.Thread(target=self.run_and_display_results, args=(current_params,))
-        thread.start()
+        sim_weeks = int(current_params['sim_time_weeks'])
+
+        if n_reps > 1:
+            # Monte-Carlo mode: fan independently seeded runs out across
+            # the worker processes and aggregate once all have finished.
+            # No live preview here; the result is a mean, not one run.
+            seeds = np.random.SeedSequence().generate_state(n_reps)
+            futures = [self.executor.submit(_run_one, (current_params, int(s)))
+                       for s in seeds]
+            self._replications_left = len(futures)
+            for fut in futures:
+                fut.add_done_callback(
+                    lambda _fut: self.after(0, self._replication_done, futures, sim_weeks))
+            return
+
+        # Run the simulation in a worker process so the GUI stays responsive.
+        self.progress_queue = self.manager.Queue()
+        self.run_active = True
+        future = self.executor.submit(run_simulation, current_params, self.progress_queue)
+        future.add_done_callback(
+            lambda fut: self.after(0, self.display_results, fut, sim_weeks))
+        self.after(100, self._drain_updates)
+
+    def _drain_updates(self):
+        """Pulls any progress samples the worker has published and redraws."""
+        drained = False
+        while True:
+            try:
+                day, backlog_size, on_treatment = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            self._live_days.append(day)
+            self._live_backlog.append(backlog_size)
+            self._live_on_tx.append(on_treatment)
+            drained = True
+
+        if drained:
+            self.backlog_line.set_data(self._live_days, self._live_backlog)
+            self.on_tx_line.set_data(self._live_days, self._live_on_tx)
+            self.ax.relim()
+            self.ax.autoscale_view()
+            self.canvas.draw_idle()
+
+        if self.run_active:
+            self.after(100, self._drain_updates)
 
     def _update_distribution_labels(self, _=None):
         """
         Called when a distribution slider is moved.
-        Calculates the percentage for each duration based on the raw slider values
-        and updates the corresponding labels.
+        Dragging a slider fires this once per pixel of movement, so the
+        actual label refresh is debounced: each call re-arms a 50 ms timer
+        and only the last one in a burst does the work.
         """
+        if self._pending_label_update is not None:
+            self.after_cancel(self._pending_label_update)
+        self._pending_label_update = self.after(50, self._do_label_update)
+
+    def _do_label_update(self):
+        """Recalculates the percentage labels from the raw slider values."""
+        self._pending_label_update = None
         raw_values = {key: var.get() for key, var in self.dist_vars.items()}
         total = sum(raw_values.values())
 
@@ -450,44 +817,84 @@ class SimulationApp(tk.Tk):
                 percentage = (raw_values[key] / total) * 100
                 self.dist_labels[key].config(text=f"{percentage:.1f}%")
 
-    def run_and_display_results(self, params):
-        center = run_simulation(params)
-        results_str = format_results(center, int(params['sim_time_weeks']))
-
-        # Schedule the GUI update to run in the main thread
-        self.after(0, self.update_gui, results_str, center)
-
-    def update_gui(self, results_str, center):
+    def display_results(self, future, sim_weeks):
+        """Runs in the main thread once the worker process has finished."""
+        self.run_active = False
+        results = future.result()
+        results_str = format_results(results, sim_weeks)
+        self.update_gui(results_str, results)
+
+    def _replication_done(self, futures, sim_weeks):
+        """Runs in the main thread as each replication future completes."""
+        self._replications_left -= 1
+        if self._replications_left:
+            return
+        all_results = [fut.result() for fut in futures]
+        mean_results, bands = aggregate_results(all_results)
+        results_str = (format_results(mean_results, sim_weeks)
+                       + f"\n\nMean of {len(all_results)} replications; "
+                         "bands span the 10th-90th percentile.")
+        self.update_gui(results_str, mean_results, bands)
+
+    def _on_close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.manager.shutdown()
+        self.destroy()
+
+    def update_gui(self, results_str, results, bands=None):
         # Update the text results
         self.results_text.delete("1.0", tk.END)
         self.results_text.insert(tk.END, results_str)
 
-        # Update the plot
-        self.ax.clear()
-
         # --- Plot Main Data Lines ---
-        backlog_data = center.backlog_data
-        on_treatment_data = center.on_treatment_data
-        overtime_patients_data = center.overtime_patients_data
-
-        if backlog_data:
-            days, backlog_sizes = zip(*backlog_data)
-            self.ax.plot(days, backlog_sizes, label='Patients in Backlog', marker='.', linestyle='-', markersize=4)
-
-        if on_treatment_data:
-            days, on_treatment_sizes = zip(*on_treatment_data)
-            self.ax.plot(days, on_treatment_sizes, label='Patients on Treatment', marker='.', linestyle='-', markersize=4)
-
-        if overtime_patients_data:
-            days, ot_patients = zip(*overtime_patients_data)
-            self.ax.plot(days, ot_patients, label='Patients in Overtime Slots', color='purple', linestyle='--', markersize=4)
-
-        self.ax.set_xlabel("Time (Working Days)")
-        self.ax.set_ylabel("Number of Patients")
-        self.ax.set_title("Patient Status Over Time")
-        self.ax.grid(True)
-        self.ax.legend()
-        self.canvas.draw()
+        # The daily series are flat arrays sampled once per day from day 0,
+        # so the x-axis is simply the day index.
+        days = np.arange(len(results.backlog_data))
+        backlog_sizes = results.backlog_data
+        on_treatment_sizes = results.on_treatment_data
+        ot_patients = results.overtime_patients_data
+
+        # Downsample very long runs: beyond a couple of thousand points the
+        # extra samples cost rasterization time without adding visible
+        # detail.
+        if len(days) > MAX_PLOT_POINTS:
+            stride = len(days) // MAX_PLOT_POINTS
+            days = days[::stride]
+            backlog_sizes = backlog_sizes[::stride]
+            on_treatment_sizes = on_treatment_sizes[::stride]
+            ot_patients = ot_patients[::stride]
+            if bands is not None:
+                bands = tuple(band[::stride] for band in bands)
+
+        # Per-point markers help read a sparse series but are pure glyph
+        # rendering cost (and visual noise) on a dense one.
+        marker = '.' if len(days) < MAX_MARKER_POINTS else 'None'
+
+        # Swap the data on the persistent lines and rescale; no clearing,
+        # no artist rebuild.
+        self.backlog_line.set_data(days, backlog_sizes)
+        self.backlog_line.set_marker(marker)
+        self.on_tx_line.set_data(days, on_treatment_sizes)
+        self.on_tx_line.set_marker(marker)
+        self.ot_line.set_data(days, ot_patients)
+
+        # Spread bands from Monte-Carlo mode are the one artist type that
+        # cannot be updated in place, so they are removed and refilled.
+        for artist in self._band_artists:
+            artist.remove()
+        self._band_artists = []
+        if bands is not None:
+            backlog_lo, backlog_hi, on_tx_lo, on_tx_hi = bands
+            self._band_artists.append(self.ax.fill_between(
+                days, backlog_lo, backlog_hi,
+                color=self.backlog_line.get_color(), alpha=0.2))
+            self._band_artists.append(self.ax.fill_between(
+                days, on_tx_lo, on_tx_hi,
+                color=self.on_tx_line.get_color(), alpha=0.2))
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
 
         self.run_button.config(state="normal")
 